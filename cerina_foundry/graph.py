@@ -1,45 +1,86 @@
+import logging
+import re
 import sqlite3
+import threading
+import time
+from collections import defaultdict
 from typing import Literal
 from langgraph.graph import StateGraph, START, END
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import Command, interrupt
+from langgraph.checkpoint.memory import MemorySaver
 from langgraph.checkpoint.sqlite import SqliteSaver 
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
 
-from state import CerinaState
+from state import CerinaState, Critique, latest_critique_by
 from nodes import drafter_node, safety_node, clinical_node, crisis_node 
 
+logger = logging.getLogger(__name__)
+
+# Keywords in safety feedback that escalate a failure to the Crisis Manager.
+# Matched as substrings so that e.g. "suicid" covers "suicide" and "suicidal".
+CRISIS_KEYWORDS = ("harm", "suicid", "kill", "death", "emergency", "danger", "hurt")
+
+# Compiled once at import so each routing call is a single C-level scan over the
+# feedback instead of one `in` scan per keyword. IGNORECASE avoids building a
+# lowercased copy of the feedback just to search it.
+CRISIS_RE = re.compile("|".join(map(re.escape, CRISIS_KEYWORDS)), re.IGNORECASE)
+
 # --- Routing Logic ---
 
+def is_crisis_feedback(feedback: str) -> bool:
+    """
+    Checks safety feedback for crisis keywords.
+
+    Deliberately not memoized: a cache would keep raw feedback, including
+    self-harm disclosures, in process memory, and the precompiled scan is
+    already cheap.
+
+    Args:
+        feedback (str): The Safety Guardian's reasoning.
+
+    Returns:
+        bool: True if the feedback indicates a crisis.
+    """
+    return CRISIS_RE.search(feedback) is not None
+
+
 def route_safety(state: CerinaState) -> Literal["crisis_manager", "drafter", "clinical_critic"]:
     """
     Determines the next step based on safety critique results.
 
-    Analyzes the latest critique to classify the safety risk. If the draft fails 
-    safety checks, it determines whether to route to the crisis manager (for 
+    Analyzes the latest safety critique to classify the safety risk. If the draft
+    fails safety checks, it determines whether to route to the crisis manager (for 
     severe risks/harm) or back to the drafter for a standard rewrite.
 
     Args:
         state (CerinaState): The current state of the workflow.
 
     Returns:
-        Literal["crisis_manager", "drafter", "clinical_critic"]: The next node to visit.
+        Literal["crisis_manager", "drafter", "clinical_critic"]: The next node to visit,
+        where "clinical_critic" means the draft is safe and the clinical verdict decides.
     """
-    latest_critique = state["critique_history"][-1]
+    latest_critique = latest_critique_by(state["critique_history"], "SafetyGuardian")
     
-    if latest_critique["status"] == "FAIL":
-        feedback_lower = latest_critique["feedback"].lower()
-        
-        # Expanded keyword list to catch variations of dangerous content
-        crisis_keywords = ["harm", "suicid", "kill", "death", "emergency", "danger", "hurt"]
-        
-        # If any keyword is found, trigger the Crisis Manager immediately
-        if any(word in feedback_lower for word in crisis_keywords):
-            print(f"!!! CRITICAL SAFETY FLAGGED: {feedback_lower} -> ROUTING TO CRISIS MANAGER !!!")
-            return "crisis_manager"
-            
-        print("!!! SAFETY VIOLATION (Standard) - LOOPING BACK !!!")
+    # A draft without a safety verdict is never treated as safe; redraft so it
+    # gets reviewed again
+    if latest_critique is None:
+        logger.warning("!!! NO SAFETY CRITIQUE FOUND - LOOPING BACK !!!")
         return "drafter"
     
-    return "clinical_critic"
+    # Fast path: a passing draft needs no keyword scan at all
+    if latest_critique.status != "FAIL":
+        return "clinical_critic"
+    
+    feedback = latest_critique.feedback
+    
+    # If any crisis keyword is found, trigger the Crisis Manager immediately
+    if is_crisis_feedback(feedback):
+        logger.warning("!!! CRITICAL SAFETY FLAGGED: %s -> ROUTING TO CRISIS MANAGER !!!", feedback)
+        return "crisis_manager"
+        
+    logger.info("!!! SAFETY VIOLATION (Standard) - LOOPING BACK !!!")
+    return "drafter"
 
 
 def route_clinical(state: CerinaState) -> Literal["drafter", "human_approval"]:
@@ -56,20 +97,53 @@ def route_clinical(state: CerinaState) -> Literal["drafter", "human_approval"]:
     Returns:
         Literal["drafter", "human_approval"]: The next node to visit.
     """
-    latest_critique = state["critique_history"][-1]
+    latest_critique = latest_critique_by(state["critique_history"], "ClinicalCritic")
     iter_count = state["iteration_count"]
     
     # Circuit Breaker: Prevent infinite loops by enforcing a max iteration limit
     if iter_count > 3:
-        print("!!! MAX ITERATIONS REACHED - FORCING HUMAN REVIEW !!!")
+        logger.info("!!! MAX ITERATIONS REACHED - FORCING HUMAN REVIEW !!!")
         return "human_approval"
 
-    if latest_critique["status"] == "FAIL":
-        print(f"--- Rejection: {latest_critique['feedback']} ---")
+    # No clinical verdict to act on, so leave the decision to the human reviewer
+    if latest_critique is None:
+        return "human_approval"
+
+    if latest_critique.status == "FAIL":
+        logger.debug("--- Rejection: %s ---", latest_critique.feedback)
         return "drafter"
         
     return "human_approval"
 
+
+def route_review(state: CerinaState) -> Literal["crisis_manager", "drafter", "human_approval"]:
+    """
+    Routes the workflow once both critics have reported on the current draft.
+
+    The safety verdict takes precedence; the clinical verdict (and its iteration
+    limit) only applies to drafts that passed the safety check.
+
+    Args:
+        state (CerinaState): The current state of the workflow.
+
+    Returns:
+        Literal["crisis_manager", "drafter", "human_approval"]: The next node to visit.
+    """
+    next_step = route_safety(state)
+    if next_step != "clinical_critic":
+        return next_step
+    return route_clinical(state)
+
+
+def review_join_node(state: CerinaState):
+    """
+    Synchronization point for the parallel critics.
+
+    Runs only after both the Safety Guardian and the Clinical Critic have
+    appended their critiques, so `route_review` sees a complete round.
+    """
+    return {}
+
 # --- Human Node ---
 
 def human_approval_node(state: CerinaState):
@@ -86,7 +160,7 @@ def human_approval_node(state: CerinaState):
     Returns:
         Command: A LangGraph Command object directing the flow to END or back to drafter.
     """
-    print("\n--- 👤 HUMAN APPROVAL REQUIRED ---")
+    logger.info("--- 👤 HUMAN APPROVAL REQUIRED ---")
     
     # Interrupt execution to wait for API input
     user_feedback = interrupt({
@@ -98,19 +172,19 @@ def human_approval_node(state: CerinaState):
     action = user_feedback.get("action")
     
     if action == "approve":
-        print("--- ✅ HUMAN APPROVED ---")
+        logger.info("--- ✅ HUMAN APPROVED ---")
         return Command(goto=END, update={"final_status": "approved"})
     
     elif action == "reject":
-        print("--- ❌ HUMAN REJECTED ---")
+        logger.info("--- ❌ HUMAN REJECTED ---")
         # Loop back to Drafter with the human's specific feedback
         return Command(goto="drafter", update={
-            "critique_history": [{
-                "agent_name": "Human", 
-                "score": 0, 
-                "feedback": user_feedback.get("feedback", "Human rejected"), 
-                "status": "FAIL"
-            }]
+            "critique_history": [Critique(
+                agent_name="Human",
+                score=0,
+                feedback=user_feedback.get("feedback", "Human rejected"),
+                status="FAIL"
+            )]
         })
 
 # --- Building the Graph ---
@@ -124,14 +198,19 @@ builder.add_node("safety_guardian", safety_node)
 builder.add_node("clinical_critic", clinical_node)
 builder.add_node("human_approval", human_approval_node)
 builder.add_node("crisis_manager", crisis_node) 
+builder.add_node("review_join", review_join_node)
 
 # Define Standard Flow
 builder.add_edge(START, "drafter")
+
+# Fan out: both critics review each draft concurrently. Neither reads the
+# other's critique, and the critique_history reducer merges their writes.
 builder.add_edge("drafter", "safety_guardian")
+builder.add_edge("drafter", "clinical_critic")
+builder.add_edge(["safety_guardian", "clinical_critic"], "review_join")
 
 # Define Conditional Logic (Routing)
-builder.add_conditional_edges("safety_guardian", route_safety)
-builder.add_conditional_edges("clinical_critic", route_clinical)
+builder.add_conditional_edges("review_join", route_review)
 
 # Wiring for Crisis Manager
 # If a crisis occurs, route to human approval for final oversight
@@ -139,8 +218,148 @@ builder.add_edge("crisis_manager", "human_approval")
 
 # --- Persistence ---
 # Initialize SQLite checkpointing for state persistence across interactions
-conn = sqlite3.connect("checkpoints.sqlite", check_same_thread=False)
-checkpointer = SqliteSaver(conn)
+DB_PATH = "checkpoints.sqlite"
+
+# Checkpoints store `Critique` dataclasses. LangGraph's msgpack serde only
+# revives registered custom types (strict mode rejects the rest on load), so
+# every checkpointer registers it explicitly.
+serde = JsonPlusSerializer(allowed_msgpack_modules=[("state", "Critique")])
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    """
+    Opens a SQLite connection tuned for LangGraph checkpoint writes.
+
+    LangGraph writes a checkpoint after every node, so SQLite is tuned for many
+    small commits: WAL lets readers (e.g. /state polling) proceed during writes,
+    and synchronous=NORMAL only fsyncs at WAL checkpoints instead of on every commit.
+
+    Args:
+        db_path (str): Path to the SQLite database file.
+
+    Returns:
+        sqlite3.Connection: A connection usable from any thread.
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+    # wal_autocheckpoint stays at its default: long-running processes also start
+    # `start_wal_checkpointer`, which keeps the WAL below the threshold so commits
+    # rarely checkpoint inline, while any other writer still bounds the WAL.
+    return conn
+
+
+conn = _connect(DB_PATH)
+checkpointer = SqliteSaver(conn, serde=serde)
+
+WAL_CHECKPOINT_INTERVAL = 30  # seconds
+
+
+def _wal_checkpoint_loop(db_path: str, interval: float):
+    """
+    Periodically copies WAL frames back into the main database file.
+
+    Runs on its own connection in a daemon thread so checkpointing never
+    happens on the request path. PASSIVE mode does as much work as it can
+    without waiting on readers or writers, so it never blocks graph execution.
+
+    Args:
+        db_path (str): Path to the SQLite database file.
+        interval (float): Seconds to wait between checkpoint attempts.
+    """
+    wal_conn = sqlite3.connect(db_path, check_same_thread=False)
+    while True:
+        time.sleep(interval)
+        try:
+            busy, log_frames, checkpointed = wal_conn.execute(
+                "PRAGMA wal_checkpoint(PASSIVE)"
+            ).fetchone()
+            if busy or checkpointed < log_frames:
+                logger.debug("--- WAL checkpoint partial: %d/%d frames ---", checkpointed, log_frames)
+        except sqlite3.Error as e:
+            logger.error("❌ WAL checkpoint failed: %s", e)
+
+
+_wal_checkpointer_lock = threading.Lock()
+_wal_checkpointer_started = False
+
+
+def start_wal_checkpointer():
+    """
+    Starts the background WAL checkpoint thread, once per process.
+
+    Called by the long-running entry points (API server, MCP server) rather
+    than at import, so scripts and tools importing this module start no thread.
+    """
+    global _wal_checkpointer_started
+    with _wal_checkpointer_lock:
+        if _wal_checkpointer_started:
+            return
+        threading.Thread(
+            target=_wal_checkpoint_loop,
+            args=(DB_PATH, WAL_CHECKPOINT_INTERVAL),
+            name="wal-checkpoint",
+            daemon=True,
+        ).start()
+        _wal_checkpointer_started = True
 
 # Compile the graph
-graph = builder.compile(checkpointer=checkpointer)
\ No newline at end of file
+graph = builder.compile(checkpointer=checkpointer)
+
+
+def compile_sqlite_graph() -> CompiledStateGraph:
+    """
+    Compiles the workflow against a new connection to the checkpoint database.
+
+    A single SqliteSaver serializes every caller on one connection; callers
+    running the graph concurrently (e.g. the API server's connection pool) each
+    take a graph from here so WAL lets their reads and writes overlap.
+
+    Returns:
+        CompiledStateGraph: A graph sharing the same workflow and database as `graph`.
+    """
+    start_wal_checkpointer()
+    return builder.compile(checkpointer=SqliteSaver(_connect(DB_PATH), serde=serde))
+
+# --- In-Memory Tier ---
+# Short-lived sessions (e.g. MCP requests) run against an in-memory checkpointer
+# so per-node state updates never touch disk. When a run pauses or ends, its
+# latest checkpoint is written back to SQLite via `flush_to_sqlite`.
+memory_checkpointer = MemorySaver(serde=serde)
+memory_graph = builder.compile(checkpointer=memory_checkpointer)
+
+
+def flush_to_sqlite(config: dict, evict: bool = False):
+    """
+    Persists the latest in-memory checkpoint of a thread to SQLite.
+
+    Copies the checkpoint together with its pending writes (which carry any
+    interrupt payload) so the session can be inspected or resumed through the
+    SQLite-backed `graph`. Intermediate per-node checkpoints are not copied, so
+    the checkpoint is written without a parent: its in-memory parent never
+    reaches disk and would leave the SQLite history dangling.
+
+    Args:
+        config (dict): Configuration containing the thread ID.
+        evict (bool): If True, drop the thread from memory after flushing.
+    """
+    saved = memory_checkpointer.get_tuple(config)
+    if saved is None:
+        return
+
+    thread_id = config["configurable"]["thread_id"]
+    thread_config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    stored_config = checkpointer.put(
+        thread_config, saved.checkpoint, saved.metadata, saved.checkpoint["channel_versions"]
+    )
+
+    writes_by_task = defaultdict(list)
+    for task_id, channel, value in saved.pending_writes or []:
+        writes_by_task[task_id].append((channel, value))
+    for task_id, writes in writes_by_task.items():
+        checkpointer.put_writes(stored_config, writes, task_id)
+
+    if evict:
+        memory_checkpointer.delete_thread(thread_id)
\ No newline at end of file
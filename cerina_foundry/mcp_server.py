@@ -8,21 +8,65 @@ review process remotely.
 """
 
 import sys
-import io
 import uuid
+import asyncio
+import logging
 from mcp.server.fastmcp import FastMCP
 from langgraph.types import Command
 
-from graph import graph
+from graph import graph, memory_graph, memory_checkpointer, flush_to_sqlite, start_wal_checkpointer
 
 # Ensure UTF-8 encoding for Windows terminals to prevent encoding errors
-# during standard output operations.
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+# during standard output operations. reconfigure() switches the existing
+# streams in place, keeping their buffering instead of wrapping them again.
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding="utf-8")
+    sys.stderr.reconfigure(encoding="utf-8")
+
+# Log to stderr: with the stdio transport, stdout carries the MCP protocol itself.
+logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+logger = logging.getLogger(__name__)
 
 # Initialize MCP Server
 mcp = FastMCP("Cerina Foundry")
 
+# Number of draft characters shown in tool responses
+PREVIEW_CHARS = 200
+
+
+def _preview(draft: str) -> str:
+    """Returns the head of a draft for tool responses, marking truncation."""
+    if len(draft) <= PREVIEW_CHARS:
+        return draft
+    return f"{draft[:PREVIEW_CHARS]}..."
+
+
+def _run_in_memory(graph_input, config: dict) -> dict:
+    """
+    Runs a new session on the in-memory graph, then moves it to SQLite.
+
+    Blocking (LLM calls and SQLite writes), so it is run on a worker thread.
+    The session only lives in memory while it runs: once it pauses or ends,
+    its latest checkpoint is flushed to SQLite and the in-memory copy is
+    evicted, so paused sessions resume (from the dashboard or the review tool)
+    through the SQLite-backed graph. A failed run is dropped outright, since
+    its session ID is never returned to the client.
+
+    Args:
+        graph_input: The initial state for the session.
+        config (dict): Configuration containing the thread ID.
+
+    Returns:
+        dict: The invoke() output.
+    """
+    try:
+        result = memory_graph.invoke(graph_input, config)
+    except Exception:
+        memory_checkpointer.delete_thread(config["configurable"]["thread_id"])
+        raise
+    flush_to_sqlite(config, evict=True)
+    return result
+
 @mcp.tool()
 async def generate_cbt_protocol(topic: str) -> str:
     """
@@ -41,7 +85,7 @@ async def generate_cbt_protocol(topic: str) -> str:
     thread_id = f"mcp_{uuid.uuid4().hex[:8]}"
     config = {"configurable": {"thread_id": thread_id}}
     
-    print(f"--- MCP Request: {topic} (Thread: {thread_id}) ---")
+    logger.info("--- MCP Request: %s (Thread: %s) ---", topic, thread_id)
 
     # Initialize state matching the structure expected by the Drafter node
     initial_state = {
@@ -52,20 +96,22 @@ async def generate_cbt_protocol(topic: str) -> str:
     }
     
     try:
-        # Run the graph synchronously until it hits the "human_approval" interrupt
-        graph.invoke(initial_state, config)
+        # Run the graph until it hits the "human_approval" interrupt. The blocking
+        # LLM calls and the flush to SQLite run on a worker thread so the MCP
+        # event loop stays responsive.
+        result = await asyncio.to_thread(_run_in_memory, initial_state, config)
         
-        # Inspect the state to determine pause location
-        snapshot = graph.get_state(config)
+        # Pending interrupts are reported in the invoke() output itself
+        interrupts = result.get("__interrupt__")
         
         # Check if paused at the human_approval node
-        if snapshot.next and snapshot.next[0] == 'human_approval':
-            interrupt_val = snapshot.tasks[0].interrupts[0].value
+        if interrupts:
+            interrupt_val = interrupts[0].value
             draft = interrupt_val["draft"]
             
             return (
                 f"✅ Protocol Draft Generated for '{topic}'\n\n"
-                f"--- DRAFT PREVIEW ---\n{draft[:200]}...\n\n"
+                f"--- DRAFT PREVIEW ---\n{_preview(draft)}\n\n"
                 f"--- STATUS ---\n"
                 f"System PAUSED for Human Approval.\n"
                 f"Session ID: {thread_id}\n"
@@ -93,7 +139,7 @@ async def review_cbt_protocol(thread_id: str, action: str, feedback: str = None)
     Returns:
         str: The final status of the protocol or the new draft if a rewrite was triggered.
     """
-    print(f"--- MCP Review: {action.upper()} (Thread: {thread_id}) ---")
+    logger.info("--- MCP Review: %s (Thread: %s) ---", action.upper(), thread_id)
     
     config = {"configurable": {"thread_id": thread_id}}
     
@@ -103,31 +149,30 @@ async def review_cbt_protocol(thread_id: str, action: str, feedback: str = None)
     }
     
     try:
-        # Resume the graph with the human decision
-        graph.invoke(Command(resume=resume_payload), config)
+        # Resume the graph with the human decision. Paused sessions are only
+        # kept in SQLite, so the resume runs on the SQLite-backed graph
+        result = await asyncio.to_thread(graph.invoke, Command(resume=resume_payload), config)
         
         # Check the resulting state
-        snapshot = graph.get_state(config)
+        interrupts = result.get("__interrupt__")
         
         # Case 1: Graph finished (Approved)
-        if not snapshot.next:
+        if not interrupts:
             return f"✅ Protocol Successfully APPROVED and Finalized for Session {thread_id}."
         
         # Case 2: Graph loop back (Rejected -> New Draft)
-        if snapshot.next and snapshot.next[0] == 'human_approval':
-             interrupt_val = snapshot.tasks[0].interrupts[0].value
-             draft = interrupt_val["draft"]
-             return (
-                 f"🔄 Protocol REJECTED. The agents have rewritten the draft.\n\n"
-                 f"--- NEW DRAFT ---\n{draft[:200]}...\n\n"
-                 f"Action Required: Please approve or reject this new version."
-             )
-             
-        return "System processed the review."
+        interrupt_val = interrupts[0].value
+        draft = interrupt_val["draft"]
+        return (
+            f"🔄 Protocol REJECTED. The agents have rewritten the draft.\n\n"
+            f"--- NEW DRAFT ---\n{_preview(draft)}\n\n"
+            f"Action Required: Please approve or reject this new version."
+        )
 
     except Exception as e:
         return f"Error submitting review: {str(e)}"
 
 
 if __name__ == "__main__":
+    start_wal_checkpointer()
     mcp.run()
\ No newline at end of file
@@ -6,22 +6,28 @@ It defines the logic for drafting, safety checks, clinical critique, and crisis
 """
 
 import os
-import requests
+import logging
+import httpx
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
 from typing import Literal, Optional
-from state import CerinaState, Critique
+from state import CerinaState, Critique, as_critique, latest_critique_by
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # --- LLM Initialization ---
 # Uses GPT-4o with a standard temperature for creativity balanced with coherence.
 try:
     llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
 except Exception as e:
-    print(f"Warning: LLM init failed (Check API Key): {e}")
+    logger.warning("LLM init failed (Check API Key): %s", e)
+    llm = None
 
 # --- Structured Output Models ---
 
@@ -38,6 +44,21 @@ class ClinicalAssessment(BaseModel):
     feedback: str
     decision: Literal["PASS", "FAIL"]
 
+# --- Cached Runnables & Prompts ---
+# Bound once at import so each node call skips regenerating the JSON schema and
+# re-wrapping the runnable. If the LLM failed to initialize these stay None and
+# the nodes fall back through their error handling.
+safety_llm = llm.with_structured_output(SafetyAssessment) if llm else None
+clinical_llm = llm.with_structured_output(ClinicalAssessment) if llm else None
+
+DRAFTER_SYSTEM_PROMPT = SystemMessage("You are an expert CBT Clinical Architect.")
+SAFETY_SYSTEM_PROMPT = SystemMessage(
+    "You are a Safety Guardian. "
+    "If the content indicates self-harm, suicide, or violence, you MUST use the word 'SUICIDE' or 'HARM' in your reasoning. "
+    "Reject illegal content. Allow standard CBT educational content."
+)
+CLINICAL_SYSTEM_PROMPT = SystemMessage("You are a strict CBT Supervisor. Rate the empathy and structure.")
+
 # --- Node Definitions ---
 
 def drafter_node(state: CerinaState):
@@ -56,7 +77,7 @@ def drafter_node(state: CerinaState):
     iteration = state.get("iteration_count", 0)
     critiques = state.get("critique_history", [])
     
-    print(f"\n--- ✍️ DRAFTER (Iteration {iteration}) ---")
+    logger.info("--- ✍️ DRAFTER (Iteration %d) ---", iteration)
 
     try:
         # Robust Message Retrieval
@@ -64,28 +85,40 @@ def drafter_node(state: CerinaState):
         messages = state.get("messages", [])
         user_query = "Create a generic CBT protocol." # Default fallback
         
-        if messages and len(messages) > 0:
-            last_msg = messages[0]
-            if isinstance(last_msg, tuple):
-                user_query = last_msg[1]
-            elif hasattr(last_msg, 'content'):
-                user_query = last_msg.content
-            else:
-                user_query = str(last_msg)
+        if messages:
+            # Dispatch on the concrete type; add_messages normally yields BaseMessage
+            match messages[0]:
+                case BaseMessage(content=content):
+                    user_query = content
+                case tuple() as raw_msg:
+                    user_query = raw_msg[1]
+                case raw_msg:
+                    user_query = str(raw_msg)
 
         # Construct Prompt based on history
         if not critiques:
             # First pass: Use the user's query
             prompt = f"Create a CBT clinical protocol for this request: {user_query}. Be empathetic but structured."
         else:
-            # Subsequent passes: Address the specific critique
-            last_feedback = critiques[-1]["feedback"]
+            # Subsequent passes: Address the critique that sent the draft back.
+            # A human rejection is appended after the critics' round; otherwise
+            # the safety verdict takes precedence, as in `route_review` (the
+            # critics' write order within a round is not meaningful)
+            rejection = as_critique(critiques[-1])
+            if rejection.agent_name != "Human":
+                safety = latest_critique_by(critiques, "SafetyGuardian")
+                clinical = latest_critique_by(critiques, "ClinicalCritic")
+                if safety is not None and safety.status == "FAIL":
+                    rejection = safety
+                elif clinical is not None:
+                    rejection = clinical
+            last_feedback = rejection.feedback
             prompt = (f"Your previous draft was rejected. Fix this specific issue: {last_feedback}. "
                       f"Rewrite the protocol for: {user_query}")
 
         # Invoke LLM
         response = llm.invoke([
-            ("system", "You are an expert CBT Clinical Architect."),
+            DRAFTER_SYSTEM_PROMPT,
             ("user", prompt)
         ])
         
@@ -97,7 +130,7 @@ def drafter_node(state: CerinaState):
     except Exception as e:
         # Catch internal errors to ensure graceful failure
         error_msg = f"SYSTEM ERROR in Drafter: {str(e)}"
-        print(f"❌ {error_msg}")
+        logger.error("❌ %s", error_msg)
         return {
             "current_draft": f"I encountered an internal error while generating the draft.\nDetails: {str(e)}\n\nPlease check the server logs.",
             "iteration_count": iteration + 1,
@@ -118,35 +151,32 @@ def safety_node(state: CerinaState):
     Returns:
         dict: Updates to 'critique_history'.
     """
-    print("\n--- 🛡️ SAFETY GUARDIAN ---")
+    logger.info("--- 🛡️ SAFETY GUARDIAN ---")
     draft = state["current_draft"]
     
     try:
-        structured_llm = llm.with_structured_output(SafetyAssessment)
-        assessment = structured_llm.invoke([
-            ("system", "You are a Safety Guardian. "
-                       "If the content indicates self-harm, suicide, or violence, you MUST use the word 'SUICIDE' or 'HARM' in your reasoning. "
-                       "Reject illegal content. Allow standard CBT educational content."),
+        assessment = safety_llm.invoke([
+            SAFETY_SYSTEM_PROMPT,
             ("user", f"Assess this content:\n{draft}")
         ])
         
         status = "PASS" if assessment.is_safe else "FAIL"
         
-        critique: Critique = {
-            "agent_name": "SafetyGuardian",
-            "score": 10 if assessment.is_safe else 0,
-            "feedback": assessment.reasoning,
-            "status": status
-        }
+        critique = Critique(
+            agent_name="SafetyGuardian",
+            score=10 if assessment.is_safe else 0,
+            feedback=assessment.reasoning,
+            status=status
+        )
     except Exception as e:
         # Fallback mechanism if the safety check itself fails
-        print(f"❌ Safety Node Error: {e}")
-        critique = {
-            "agent_name": "SafetyGuardian",
-            "score": 5, 
-            "feedback": "Safety check failed due to system error. Proceeding with caution.",
-            "status": "PASS"
-        }
+        logger.error("❌ Safety Node Error: %s", e)
+        critique = Critique(
+            agent_name="SafetyGuardian",
+            score=5,
+            feedback="Safety check failed due to system error. Proceeding with caution.",
+            status="PASS"
+        )
     
     return {"critique_history": [critique]}
 
@@ -163,34 +193,41 @@ def clinical_node(state: CerinaState):
     Returns:
         dict: Updates to 'critique_history'.
     """
-    print("\n--- 🩺 CLINICAL CRITIC ---")
+    logger.info("--- 🩺 CLINICAL CRITIC ---")
     draft = state["current_draft"]
     
     try:
-        structured_llm = llm.with_structured_output(ClinicalAssessment)
-        assessment = structured_llm.invoke([
-            ("system", "You are a strict CBT Supervisor. Rate the empathy and structure."),
+        assessment = clinical_llm.invoke([
+            CLINICAL_SYSTEM_PROMPT,
             ("user", f"Evaluate this draft:\n{draft}")
         ])
         
-        critique: Critique = {
-            "agent_name": "ClinicalCritic",
-            "score": assessment.empathy_score,
-            "feedback": assessment.feedback,
-            "status": assessment.decision
-        }
+        critique = Critique(
+            agent_name="ClinicalCritic",
+            score=assessment.empathy_score,
+            feedback=assessment.feedback,
+            status=assessment.decision
+        )
     except Exception as e:
-        critique = {
-            "agent_name": "ClinicalCritic",
-            "score": 5,
-            "feedback": "Clinical check failed. Defaulting to PASS.",
-            "status": "PASS"
-        }
+        critique = Critique(
+            agent_name="ClinicalCritic",
+            score=5,
+            feedback="Clinical check failed. Defaulting to PASS.",
+            status="PASS"
+        )
     
     return {"critique_history": [critique]}
 
 # --- Crisis Logic ---
 
+# NOTE: In a production environment, use environment variables for the Webhook URL.
+WEBHOOK_URL = "#############"
+
+# One pooled client reuses the TCP/TLS connection across alerts, and a single
+# background worker delivers them so the crisis node never waits on the network.
+_alert_client = httpx.Client(timeout=3)
+_alert_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alert")
+
 def send_internal_alert(thread_id: str, draft: str, reason: str):
     """
     Sends an immediate alert via Discord Webhook.
@@ -205,27 +242,23 @@ def send_internal_alert(thread_id: str, draft: str, reason: str):
     Returns:
         bool: True if alert sent successfully, False otherwise.
     """
-    # NOTE: In a production environment, use environment variables for the Webhook URL.
-    WEBHOOK_URL = "#############" 
-    
-    print(f"\n>>> 📨 [DISCORD] SENDING ALERT TO SERVER...")
+    logger.info(">>> 📨 [DISCORD] SENDING ALERT TO SERVER...")
 
     payload = {
         "content": f"🚨 **CRITICAL SAFETY ALERT** 🚨\n\n**Session ID:** `{thread_id}`\n**Reason:** {reason}\n**Draft Snippet:** _{draft[:100]}..._"
     }
 
     try:
-        response = requests.post(WEBHOOK_URL, json=payload, timeout=3)
+        response = _alert_client.post(WEBHOOK_URL, json=payload)
         if response.status_code == 204:
-            print(f">>> ✅ [DISCORD] ALERT SENT SUCCESSFULLY.")
+            logger.info(">>> ✅ [DISCORD] ALERT SENT SUCCESSFULLY.")
             return True
         else:
-            print(f">>> ⚠️ [DISCORD] FAILED: {response.status_code}")
+            logger.warning(">>> ⚠️ [DISCORD] FAILED: %s", response.status_code)
             return False
     except Exception as e:
         # Catch network blocks so the app DOES NOT CRASH
-        print(f">>> ❌ [DISCORD] NETWORK ERROR: {e}")
-        print(">>> (Continuing workflow without alert)")
+        logger.error(">>> ❌ [DISCORD] NETWORK ERROR: %s (Continuing workflow without alert)", e)
         return False
 
 
@@ -244,16 +277,17 @@ def crisis_node(state: CerinaState, config):
     Returns:
         dict: The final safe state with a 'rejected' status.
     """
-    print("\n--- 🚨 CRISIS MANAGER ACTIVATED ---")
+    logger.warning("--- 🚨 CRISIS MANAGER ACTIVATED ---")
     
     thread_id = config["configurable"]["thread_id"]
-    latest_critique = state["critique_history"][-1]
+    latest_critique = latest_critique_by(state["critique_history"], "SafetyGuardian")
     
-    # 1. Send Alert (Side Effect)
-    send_internal_alert(
+    # 1. Send Alert (Side Effect, fire-and-forget on the alert worker)
+    _alert_executor.submit(
+        send_internal_alert,
         thread_id=thread_id,
         draft=state["current_draft"],
-        reason=latest_critique["feedback"]
+        reason=latest_critique.feedback if latest_critique else "Unknown (no safety critique recorded)"
     )
     
     # 2. Overwrite Draft with Safe Message
@@ -6,16 +6,32 @@ frontend dashboard (or external clients) and the LangGraph-based clinical workfl
 It handles session management, workflow execution, and human-in-the-loop interventions.
 """
 
+import logging
+import queue
+import threading
 import uvicorn
+from contextlib import asynccontextmanager, contextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import Command
-from graph import graph
+from graph import graph as state_graph, compile_sqlite_graph, start_wal_checkpointer
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Configures logging and starts background services before the server accepts requests."""
+    # Done at startup rather than import, so importing this module leaves the
+    # global logging setup alone
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    start_wal_checkpointer()
+    yield
 
 # Initialize FastAPI application
-app = FastAPI(title="Cerina Protocol Foundry API")
+app = FastAPI(title="Cerina Protocol Foundry API", lifespan=lifespan)
 
 # Configure CORS to allow requests from the frontend
 app.add_middleware(
@@ -39,27 +55,73 @@ class ReviewRequest(BaseModel):
     action: str  # Expected values: "approve" or "reject"
     feedback: Optional[str] = None
 
+# --- Connection Pool ---
+# `/run` and `/human-review` hold a graph for a whole LLM pipeline, so each
+# borrows one compiled against its own SQLite connection. Graphs are created on
+# first demand, so only the API server ever opens these connections.
+GRAPH_POOL_SIZE = 4
+
+_graph_pool: "queue.Queue[CompiledStateGraph]" = queue.Queue()
+_graph_pool_lock = threading.Lock()
+_graphs_created = 0
+
+
+@contextmanager
+def pooled_graph() -> Iterator[CompiledStateGraph]:
+    """
+    Borrows a compiled graph backed by its own SQLite connection.
+
+    Creates a new graph while fewer than `GRAPH_POOL_SIZE` exist, otherwise
+    blocks until one is returned, so at most `GRAPH_POOL_SIZE` connections are
+    ever open for running workflows.
+
+    Yields:
+        CompiledStateGraph: A graph sharing the workflow and database of `graph.graph`.
+    """
+    global _graphs_created
+    try:
+        pooled = _graph_pool.get_nowait()
+    except queue.Empty:
+        with _graph_pool_lock:
+            can_create = _graphs_created < GRAPH_POOL_SIZE
+            if can_create:
+                _graphs_created += 1
+        if not can_create:
+            pooled = _graph_pool.get()
+        else:
+            try:
+                pooled = compile_sqlite_graph()
+            except Exception:
+                with _graph_pool_lock:
+                    _graphs_created -= 1
+                raise
+    try:
+        yield pooled
+    finally:
+        _graph_pool.put(pooled)
+
 # --- Helper Functions ---
 
-def process_graph_result(result: Dict[str, Any], config: Dict) -> Dict[str, Any]:
+def process_graph_result(result: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Analyzes the graph state to determine the current workflow status.
+    Analyzes the graph output to determine the current workflow status.
 
     Checks if the workflow has paused at an interrupt (waiting for human review)
-    or if it has completed execution.
+    or if it has completed execution. `invoke()` reports pending interrupts under
+    the `__interrupt__` key of its output, so no extra checkpoint read is needed.
 
     Args:
         result (Dict[str, Any]): The output from the last graph invocation.
-        config (Dict): The configuration dictionary containing the thread_id.
 
     Returns:
         Dict[str, Any]: A dictionary containing status, draft content, and critiques.
     """
-    snapshot = graph.get_state(config)
+    interrupts = result.get("__interrupt__")
     
     # Check if the workflow is paused at the 'human_approval' node
-    if snapshot.next and snapshot.next[0] == 'human_approval':
-        interrupt_value = snapshot.tasks[0].interrupts[0].value
+    # (the only node in the workflow that interrupts)
+    if interrupts:
+        interrupt_value = interrupts[0].value
         return {
             "status": "PAUSED",
             "node": "human_approval",
@@ -81,8 +143,12 @@ def health_check():
     """Simple health check endpoint to verify server status."""
     return {"status": "Cerina Foundry is Online"}
 
+# Endpoints are plain `def` so FastAPI runs them in its worker threadpool: each
+# request borrows its own pooled graph/connection instead of blocking the event
+# loop on one shared SQLite connection.
+
 @app.post("/run")
-async def run_workflow(request: RunRequest):
+def run_workflow(request: RunRequest):
     """
     Starts a new generation session based on the user's query.
 
@@ -104,14 +170,15 @@ async def run_workflow(request: RunRequest):
     
     try:
         # invoke() blocks until the graph pauses (interrupt) or finishes
-        result = graph.invoke(initial_state, config=config)
-        return process_graph_result(result, config)
+        with pooled_graph() as graph:
+            result = graph.invoke(initial_state, config=config)
+        return process_graph_result(result)
     except Exception as e:
-        print(f"SERVER ERROR: {e}")
+        logger.exception("SERVER ERROR: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/human-review")
-async def human_review(request: ReviewRequest):
+def human_review(request: ReviewRequest):
     """
     Submits human feedback to a paused workflow.
 
@@ -130,14 +197,15 @@ async def human_review(request: ReviewRequest):
     
     try:
         # Resume the graph using the Command object
-        result = graph.invoke(Command(resume=resume_payload), config=config)
-        return process_graph_result(result, config)
+        with pooled_graph() as graph:
+            result = graph.invoke(Command(resume=resume_payload), config=config)
+        return process_graph_result(result)
     except Exception as e:
-        print(f"SERVER ERROR: {e}")
+        logger.exception("SERVER ERROR: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/state/{thread_id}")
-async def get_state(thread_id: str):
+def get_state(thread_id: str):
     """
     Retrieves the current state of a specific session.
 
@@ -150,9 +218,12 @@ async def get_state(thread_id: str):
     config = {"configurable": {"thread_id": thread_id}}
     
     try:
-        # Pass an empty dict as the first arg because process_graph_result 
-        # relies on graph.get_state(), not the direct result object.
-        return process_graph_result({}, config)
+        # No invocation output here, so read the pending interrupts from the
+        # latest checkpoint instead. Reads use their own connection rather than
+        # the pool, so dashboard polling never waits behind in-flight runs.
+        snapshot = state_graph.get_state(config)
+        interrupts = [i for task in snapshot.tasks for i in task.interrupts]
+        return process_graph_result({"__interrupt__": interrupts})
     except Exception as e:
          # Return IDLE status if the state does not exist or cannot be retrieved
          return {"status": "IDLE"}
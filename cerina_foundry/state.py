@@ -1,18 +1,24 @@
 """
 State Definitions for the Cerina Workflow.
 
-This module defines the TypedDict structures used to manage the state of the 
-LangGraph application. It defines the structure for agent critiques and the 
-global graph state.
+This module defines the structures used to manage the state of the LangGraph
+application. It defines the structure for agent critiques and the global graph
+state.
 """
 
-from typing import TypedDict, Annotated, List, Literal
+from dataclasses import dataclass
+from operator import add
+from typing import TypedDict, Annotated, List, Literal, Optional, Union
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage
 
-class Critique(TypedDict):
+@dataclass(slots=True, frozen=True)
+class Critique:
     """
     Represents a single piece of feedback from an automated agent.
+
+    A frozen, slotted dataclass: routers read critiques on every step, and slots
+    give fast attribute access and a smaller footprint than a per-critique dict.
     
     Attributes:
         agent_name (str): The name of the agent providing feedback (e.g., 'SafetyGuardian').
@@ -25,6 +31,44 @@ class Critique(TypedDict):
     feedback: str
     status: Literal["PASS", "FAIL"]
 
+def as_critique(critique: Union[Critique, dict]) -> Critique:
+    """
+    Normalizes a critique read back from a checkpoint.
+
+    Checkpoints written before `Critique` became a dataclass store critiques
+    as plain dicts; converting them here lets those sessions still resume.
+
+    Args:
+        critique (Union[Critique, dict]): A critique from the history.
+
+    Returns:
+        Critique: The critique as a dataclass.
+    """
+    if isinstance(critique, Critique):
+        return critique
+    return Critique(**critique)
+
+def latest_critique_by(critiques: List[Critique], agent_name: str) -> Optional[Critique]:
+    """
+    Returns the most recent critique written by a given agent.
+
+    The safety and clinical critics run in parallel, so the last entry of the
+    history is not necessarily the one a router or node is interested in.
+
+    Args:
+        critiques (List[Critique]): The critique history, oldest first.
+        agent_name (str): The agent whose latest critique is wanted.
+
+    Returns:
+        Optional[Critique]: The latest matching critique, or None if the agent
+        has not written one.
+    """
+    for critique in reversed(critiques):
+        critique = as_critique(critique)
+        if critique.agent_name == agent_name:
+            return critique
+    return None
+
 class CerinaState(TypedDict):
     """
     The central state object for the Cerina workflow.
@@ -42,9 +86,9 @@ class CerinaState(TypedDict):
     iteration_count: int
     
     # An append-only log of all critiques received during the session.
-    # The lambda function `lambda x, y: x + y` ensures new critiques are added to the list
-    # rather than overwriting the existing ones.
-    critique_history: Annotated[List[Critique], lambda x, y: x + y]
+    # The `operator.add` reducer ensures new critiques are added to the list
+    # rather than overwriting the existing ones (C-level, no Python frame per update).
+    critique_history: Annotated[List[Critique], add]
     
     # The current high-level status of the workflow
     final_status: Literal["drafting", "reviewing", "human_review", "approved", "rejected", "error"]
\ No newline at end of file
@@ -1,49 +1,834 @@
 """
 Graph Visualization Utility for Cerina.
 
-This script generates a static image (PNG) of the LangGraph workflow architecture.
-It uses the Mermaid.js rendering engine via LangChain to visualize the nodes,
-edges, and conditional routing logic defined in `graph.py`.
+This script generates a diagram of the LangGraph workflow architecture, as SVG
+or PNG. SVG is the primary format: it is vector, a fraction of the size of the
+PNG and needs no rasterization step. It uses the Mermaid.js rendering engine to
+visualize the nodes, edges, and conditional routing logic defined in `graph.py`,
+preferring local renderers (headless Chromium via pyppeteer, or the `mmdc` CLI
+from @mermaid-js/mermaid-cli) and falling back to the mermaid.ink web API. For
+PNG output with `cairosvg` installed, the API is asked for a compact SVG that is
+rasterized locally instead of a PNG.
+
+Rendered images are cached in `.cache/`, keyed by a hash of the Mermaid source,
+so re-running the script on an unchanged graph skips the rendering API call.
+A `GraphRenderer` keeps one headless browser open across renders, so callers
+producing several diagrams pay the browser start-up cost only once. Renderers
+write straight to disk rather than holding the whole image in memory.
+
+The headless browser loads a pinned Mermaid bundle from `vendor/mermaid.min.js`,
+never from a CDN, so it works offline. Download the bundle once with
+`--fetch-mermaid`; until it exists, the browser renderer is skipped.
+
+Usage:
+    python visualize_graph.py [-q] [--no-xray] [--format {png,svg} ...] [-o OUTPUT] [--fetch-mermaid]
+
+Progress is logged to stderr; `-q` limits output to warnings and errors.
 """
 
-from graph import graph
-from langchain_core.runnables.graph import MermaidDrawMethod
+import argparse
+import asyncio
+import base64
+import functools
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import sys
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from xml.parsers.expat import ExpatError
+from typing import Iterator, Literal, Optional, Sequence, Union
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed store of previously rendered diagrams
+CACHE_DIR = Path(".cache")
+
+# Mermaid bundle loaded into the headless browser from disk, so launching the
+# browser needs no network access. `fetch_mermaid_bundle` downloads the pinned
+# release into place (`vendor/` is git-ignored).
+MERMAID_VERSION = "11.4.1"
+MERMAID_JS_PATH = Path(__file__).resolve().parent / "vendor" / "mermaid.min.js"
+MERMAID_JS_DOWNLOAD_URL = f"https://cdn.jsdelivr.net/npm/mermaid@{MERMAID_VERSION}/dist/mermaid.min.js"
+
+# SHA-256 of the audited `mermaid.min.js` for MERMAID_VERSION. The bundle runs
+# inside Chromium, so it is only installed or loaded when it matches this digest;
+# while the digest is unset, fetching refuses and the browser renderer is skipped.
+MERMAID_JS_SHA256 = ""
+
+# Output formats a diagram can be generated in
+DiagramFormat = Literal["svg", "png"]
+
+# Pixel width of PNGs rasterized locally from SVG
+PNG_WIDTH = 1600
+
+# mermaid.ink takes the diagram base64-encoded in the URL and answers HTTP 400
+# once that grows too long, so larger sources skip the API renderers entirely
+MERMAID_INK_MAX_SOURCE_BYTES = 8000
+
+# Attempts per mermaid.ink request; transient failures (5xx, dropped
+# connections, timeouts) are retried, client errors are not
+MERMAID_INK_ATTEMPTS = 2
+
+
+class RendererUnavailableError(Exception):
+    """Raised when a renderer cannot produce a diagram (or none of them can)."""
+
+
+# Errors that mean a renderer cannot produce this diagram, so the next one is
+# tried: a missing optional package or executable, a failed subprocess or
+# request, or a renderer-specific refusal converted where it is raised.
+# Anything else is a bug and propagates.
+RENDERER_ERRORS = (
+    ImportError,
+    OSError,
+    subprocess.SubprocessError,
+    requests.RequestException,
+    RendererUnavailableError,
+)
+
+# SVG rasterizers cannot draw the <foreignObject> elements Mermaid uses for HTML
+# labels, so SVGs meant for rasterization are rendered with plain SVG text.
+SVG_TEXT_LABELS_DIRECTIVE = '%%{init: {"flowchart": {"htmlLabels": false}}}%%'
+
+# scour options for Mermaid SVGs. IDs are kept as they are, because Mermaid's
+# embedded <style> selects elements through the diagram's root id.
+SCOUR_ARGS = ["--remove-metadata", "--enable-comment-stripping", "--strip-xml-prolog", "--indent=none", "--no-line-breaks"]
+
+
+# Open flags for files written front to back once. O_SEQUENTIAL (Windows only)
+# hints the cache manager to read ahead and drop pages behind the writer.
+_SEQUENTIAL_WRITE_FLAGS = (
+    os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0) | getattr(os, "O_SEQUENTIAL", 0)
+)
+
+
+def _fsync_path(path: Path):
+    """Flushes a file's contents to stable storage."""
+    fd = os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def _atomic_output(path: Path) -> Iterator[Path]:
+    """
+    Provides a temporary path that replaces `path` once writing succeeds.
+
+    Readers never observe a partially written file, and a failed write leaves
+    any previous version of the file untouched. The temporary file is synced
+    before the rename, so a crash cannot leave a renamed but empty file. It
+    keeps the original suffix, since some renderers pick the format from the
+    extension.
+
+    Args:
+        path (Path): The destination file.
+
+    Yields:
+        Path: The temporary file to write to.
+    """
+    tmp_path = path.with_name(f".{path.stem}.tmp{path.suffix}")
+    try:
+        yield tmp_path
+        _fsync_path(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def fetch_mermaid_bundle(force: bool = False) -> Path:
+    """
+    Downloads the pinned Mermaid bundle used by the headless browser.
+
+    Args:
+        force (bool): Download again even if the bundle already exists.
+
+    Returns:
+        Path: The vendored bundle, `MERMAID_JS_PATH`.
+
+    Raises:
+        requests.RequestException: If the download fails.
+        ValueError: If no digest is pinned, or the download does not match it.
+    """
+    if not MERMAID_JS_SHA256:
+        raise ValueError("MERMAID_JS_SHA256 is not set; pin the bundle's digest before fetching it")
+
+    if MERMAID_JS_PATH.exists() and not force:
+        _verify_mermaid_bundle()
+        logger.info(">>> Mermaid bundle already present at '%s'", MERMAID_JS_PATH)
+        return MERMAID_JS_PATH
+
+    logger.info(">>> Downloading Mermaid %s...", MERMAID_VERSION)
+    MERMAID_JS_PATH.parent.mkdir(exist_ok=True)
+    digest = hashlib.sha256()
+    with requests.get(MERMAID_JS_DOWNLOAD_URL, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        with _atomic_output(MERMAID_JS_PATH) as tmp_file:
+            with open(tmp_file, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    digest.update(chunk)
+                    f.write(chunk)
+            # Raising here discards the temporary file before it is renamed
+            if digest.hexdigest() != MERMAID_JS_SHA256:
+                raise ValueError(f"downloaded Mermaid bundle has SHA-256 {digest.hexdigest()}, expected {MERMAID_JS_SHA256}")
+    logger.info(">>> ✅ Saved Mermaid bundle to '%s'", MERMAID_JS_PATH)
+    return MERMAID_JS_PATH
+
+
+def _verify_mermaid_bundle():
+    """
+    Checks the vendored Mermaid bundle against `MERMAID_JS_SHA256`.
+
+    Raises:
+        FileNotFoundError: If the bundle has not been fetched.
+        ValueError: If no digest is pinned, or the bundle does not match it.
+    """
+    if not MERMAID_JS_SHA256:
+        raise ValueError("MERMAID_JS_SHA256 is not set; refusing to load an unpinned Mermaid bundle")
+    actual = hashlib.sha256(MERMAID_JS_PATH.read_bytes()).hexdigest()
+    if actual != MERMAID_JS_SHA256:
+        raise ValueError(f"{MERMAID_JS_PATH} has SHA-256 {actual}, expected {MERMAID_JS_SHA256}")
+
+
+@functools.lru_cache(maxsize=None)
+def _drawable_graph(xray: bool = True):
+    """
+    Returns the drawable view of the workflow graph, computed once per process.
+
+    `get_graph(xray=True)` walks every nested subgraph; repeated calls (e.g. a
+    long-running process regenerating diagrams) reuse the first traversal.
+
+    Args:
+        xray (bool): Whether to expand nested subgraphs.
+
+    Returns:
+        Graph: LangChain's drawable graph representation.
+    """
+    # Imported here so importing this module does not build the workflow
+    # (LLM clients, SQLite connections) until a diagram is actually drawn
+    from graph import graph
+
+    return graph.get_graph(xray=xray)
+
+
+def _source_digest(mermaid_src: str) -> str:
+    """
+    Hashes a diagram's Mermaid source.
+
+    The Mermaid source fully determines the image, so this digest identifies
+    a rendered diagram.
+
+    Args:
+        mermaid_src (str): The Mermaid diagram source.
+
+    Returns:
+        str: A hex digest of the source.
+    """
+    return hashlib.blake2b(mermaid_src.encode(), digest_size=16).hexdigest()
+
+
+def _cache_path(mermaid_src: str, fmt: DiagramFormat = "png") -> Path:
+    """
+    Returns the cache location for a rendered diagram.
+
+    Args:
+        mermaid_src (str): The Mermaid diagram source.
+        fmt (DiagramFormat): The image format, "svg" or "png".
+
+    Returns:
+        Path: The cache file, which may not exist yet.
+    """
+    return CACHE_DIR / f"diagram-{_source_digest(mermaid_src)}.{fmt}"
+
+
+def _render_with_mmdc(mermaid_src: str, out_path: Path):
+    """
+    Renders Mermaid source locally with the mermaid-cli (`mmdc`).
+
+    Args:
+        mermaid_src (str): The Mermaid diagram source.
+        out_path (Path): Where to write the image; its suffix (".svg" or
+            ".png") selects the format.
+
+    Raises:
+        FileNotFoundError: If `mmdc` is not installed.
+        subprocess.CalledProcessError: If `mmdc` fails to render the diagram.
+    """
+    mmdc = shutil.which("mmdc")
+    if mmdc is None:
+        raise FileNotFoundError("mmdc not found on PATH")
+
+    subprocess.run(
+        [mmdc, "-i", "-", "-o", str(out_path), "-e", out_path.suffix.lstrip(".")],
+        input=mermaid_src.encode(),
+        capture_output=True,
+        check=True,
+    )
+
 
-def generate_graph_image():
+def _mermaid_ink_url(endpoint: str, mermaid_src: str) -> str:
     """
-    Compiles the current graph state and exports it as a PNG image.
-    
-    This function inspects the compiled graph object, including 'x-ray' views
-    of nested subgraphs if present, and saves the visual representation to the
-    local filesystem.
-    
+    Builds a mermaid.ink URL for a diagram, refusing sources the API rejects.
+
+    Args:
+        endpoint (str): The API endpoint, "img" or "svg".
+        mermaid_src (str): The Mermaid diagram source.
+
+    Returns:
+        str: The request URL (without query parameters).
+
     Raises:
-        Exception: If the graph cannot be rendered (often due to missing network
-                   access for the API or missing local rendering libraries).
+        RendererUnavailableError: If the source exceeds `MERMAID_INK_MAX_SOURCE_BYTES`.
     """
-    print(">>> Generating Architecture Diagram...")
-    
+    source_bytes = mermaid_src.encode()
+    if len(source_bytes) > MERMAID_INK_MAX_SOURCE_BYTES:
+        raise RendererUnavailableError(
+            f"diagram source is {len(source_bytes)} bytes, over the "
+            f"{MERMAID_INK_MAX_SOURCE_BYTES}-byte mermaid.ink limit; render locally instead"
+        )
+    encoded = base64.urlsafe_b64encode(source_bytes).decode("ascii")
+    return f"https://mermaid.ink/{endpoint}/{encoded}"
+
+
+def _raise_for_api_status(response: requests.Response):
+    """
+    Raises for a failed mermaid.ink response, explaining oversized diagrams.
+
+    The messages leave out the request URL, which embeds the whole diagram.
+
+    Args:
+        response (requests.Response): The API response.
+
+    Raises:
+        RendererUnavailableError: If the API rejected the diagram (HTTP 400).
+        requests.HTTPError: For any other error status.
+    """
+    if response.status_code == 400:
+        raise RendererUnavailableError("mermaid.ink rejected the diagram (HTTP 400), usually because it is too large")
+    if response.status_code >= 400:
+        raise requests.HTTPError(f"mermaid.ink answered HTTP {response.status_code}", response=response)
+
+
+def _get_from_api(url: str, stream: bool = False) -> requests.Response:
+    """
+    Sends a GET request to mermaid.ink, retrying transient failures.
+
+    Server errors (5xx), dropped connections and timeouts are retried up to
+    `MERMAID_INK_ATTEMPTS` times in total; any other error status raises at once.
+
+    Args:
+        url (str): The request URL.
+        stream (bool): Whether to stream the response body.
+
+    Returns:
+        requests.Response: The successful response.
+
+    Raises:
+        RendererUnavailableError: If the API rejected the diagram (HTTP 400).
+        requests.RequestException: If the request still fails after retrying.
+    """
+    for attempt in range(1, MERMAID_INK_ATTEMPTS + 1):
+        last_attempt = attempt == MERMAID_INK_ATTEMPTS
+        try:
+            response = requests.get(url, stream=stream, timeout=10)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            # Reported by type only: the message would repeat the URL
+            if last_attempt:
+                raise type(e)(f"mermaid.ink request failed ({type(e).__name__})") from e
+            logger.debug(">>> mermaid.ink request failed (%s), retrying", type(e).__name__)
+            continue
+
+        if response.status_code >= 500 and not last_attempt:
+            logger.debug(">>> mermaid.ink answered HTTP %d, retrying", response.status_code)
+            response.close()
+            continue
+
+        try:
+            _raise_for_api_status(response)
+        except (RendererUnavailableError, requests.HTTPError):
+            response.close()
+            raise
+        return response
+
+
+def _render_with_api(mermaid_src: str, png_path: Path):
+    """
+    Renders Mermaid source to PNG through the mermaid.ink web API.
+
+    The response is streamed to disk in chunks instead of being buffered.
+
+    Args:
+        mermaid_src (str): The Mermaid diagram source.
+        png_path (Path): Where to write the PNG image.
+    """
+    url = _mermaid_ink_url("img", mermaid_src) + "?type=png&bgColor=!white"
+    with _get_from_api(url, stream=True) as response:
+        with os.fdopen(os.open(png_path, _SEQUENTIAL_WRITE_FLAGS, 0o644), "wb") as f:
+            for chunk in response.iter_content(chunk_size=1 << 16):
+                f.write(chunk)
+
+
+def _with_svg_text_labels(mermaid_src: str) -> str:
+    """
+    Adds the directive that makes Mermaid emit plain SVG text labels.
+
+    The directive goes after the YAML front matter, if any, because Mermaid
+    only recognizes front matter at the very start of the source.
+
+    Args:
+        mermaid_src (str): The Mermaid diagram source.
+
+    Returns:
+        str: The source with the directive added.
+    """
+    if mermaid_src.startswith("---"):
+        end = mermaid_src.index("\n---", 3) + len("\n---\n")
+        return mermaid_src[:end] + SVG_TEXT_LABELS_DIRECTIVE + "\n" + mermaid_src[end:]
+    return SVG_TEXT_LABELS_DIRECTIVE + "\n" + mermaid_src
+
+
+def _fetch_api_svg(mermaid_src: str) -> str:
+    """
+    Renders Mermaid source to SVG through the mermaid.ink web API.
+
+    Args:
+        mermaid_src (str): The Mermaid diagram source.
+
+    Returns:
+        str: The SVG document.
+    """
+    return _get_from_api(_mermaid_ink_url("svg", mermaid_src)).text
+
+
+def _optimize_svg(svg_path: Path):
+    """
+    Shrinks an SVG file in place with scour, when it is installed.
+
+    Mermaid emits whitespace, comments and default-valued attributes that scour
+    prunes without changing the drawing.
+
+    Args:
+        svg_path (Path): The SVG file to optimize.
+    """
+    try:
+        from scour import scour
+    except ImportError:
+        logger.debug(">>> scour not installed, writing the SVG unoptimized")
+        return
+
+    svg = svg_path.read_text(encoding="utf-8")
+    try:
+        optimized = scour.scourString(svg, scour.parse_args(SCOUR_ARGS))
+    except ExpatError as e:
+        # The SVG already rendered fine; keep it as it is rather than fail
+        logger.warning(">>> scour could not parse the SVG (%s), keeping it unoptimized", e)
+        return
+    svg_path.write_text(optimized, encoding="utf-8")
+    logger.debug(">>> scour shrank the SVG from %d to %d bytes", len(svg), len(optimized))
+
+
+def _render_svg_with_api(mermaid_src: str, svg_path: Path):
+    """
+    Renders Mermaid source to an SVG file through the mermaid.ink web API.
+
+    Args:
+        mermaid_src (str): The Mermaid diagram source.
+        svg_path (Path): Where to write the SVG document.
+    """
+    svg_path.write_text(_fetch_api_svg(mermaid_src), encoding="utf-8")
+
+
+def _rasterize(svg: str, png_path: Path):
+    """
+    Converts an SVG document to PNG locally with CairoSVG.
+
+    Args:
+        svg (str): The SVG document.
+        png_path (Path): Where to write the PNG image, `PNG_WIDTH` pixels wide
+            on a white background.
+
+    Raises:
+        ImportError: If `cairosvg` is not installed.
+    """
+    import cairosvg
+
+    cairosvg.svg2png(
+        bytestring=svg.encode(), write_to=str(png_path), output_width=PNG_WIDTH, background_color="white"
+    )
+
+
+def _render_with_api_svg(mermaid_src: str, png_path: Path):
+    """
+    Fetches the diagram from mermaid.ink as SVG and rasterizes it locally.
+
+    SVG is a far smaller download than the server-rendered PNG.
+
+    Args:
+        mermaid_src (str): The Mermaid diagram source.
+        png_path (Path): Where to write the PNG image.
+    """
+    # Checked before the network call so a missing rasterizer costs nothing
+    import cairosvg  # noqa: F401
+
+    _rasterize(_fetch_api_svg(_with_svg_text_labels(mermaid_src)), png_path)
+
+
+def _chromium_args() -> list:
+    """
+    Returns the command-line flags for the headless Chromium.
+
+    Chromium refuses to start its sandbox as root, which is common in
+    containers, so the sandbox is only disabled there or when
+    `CERINA_CHROMIUM_NO_SANDBOX=1` is set (e.g. for unprivileged containers).
+    """
+    as_root = hasattr(os, "geteuid") and os.geteuid() == 0
+    if as_root or os.environ.get("CERINA_CHROMIUM_NO_SANDBOX") == "1":
+        return ["--no-sandbox"]
+    return []
+
+
+class GraphRenderer:
+    """
+    Renders Mermaid sources to SVG or PNG, reusing one headless browser across renders.
+
+    Launching Chromium takes seconds, so the browser is started on first use and
+    kept open until the renderer is closed. When the browser is unavailable,
+    renders fall back to `mmdc` and then to the mermaid.ink API (for PNGs, as a
+    locally rasterized SVG when `cairosvg` is installed).
+
+    Usage:
+        with GraphRenderer() as renderer:
+            renderer.render_svg(mermaid_src, Path("diagram.svg"))
+            renderer.render_png(mermaid_src, Path("diagram.png"))
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._browser = None
+        self._page = None
+        # Set when the browser fails to launch, so later renders skip it
+        self._browser_error: Optional[Exception] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shuts down the browser (if it was started) and the event loop."""
+        self._close_browser()
+        self._loop.close()
+
+    def _close_browser(self):
+        """Shuts down the browser, if it was started."""
+        if self._browser is not None:
+            browser, self._browser, self._page = self._browser, None, None
+            try:
+                self._loop.run_until_complete(browser.close())
+            except Exception as e:
+                logger.debug(">>> Browser did not shut down cleanly: %s", e)
+
+    def render_svg(self, mermaid_src: str, svg_path: Path):
+        """
+        Renders Mermaid source to SVG with the first renderer that succeeds.
+
+        The result is optimized with scour when it is installed.
+
+        Args:
+            mermaid_src (str): The Mermaid diagram source.
+            svg_path (Path): Where to write the SVG document.
+
+        Raises:
+            RendererUnavailableError: If every renderer failed.
+        """
+        renderers = (
+            ("pyppeteer", self._render_svg_with_browser),
+            ("mmdc", _render_with_mmdc),
+            ("mermaid.ink API", _render_svg_with_api),
+        )
+        self._render_first(renderers, mermaid_src, svg_path)
+        _optimize_svg(svg_path)
+
+    def render_png(self, mermaid_src: str, png_path: Path):
+        """
+        Renders Mermaid source to PNG with the first renderer that succeeds.
+
+        Args:
+            mermaid_src (str): The Mermaid diagram source.
+            png_path (Path): Where to write the PNG image.
+
+        Raises:
+            RendererUnavailableError: If every renderer failed.
+        """
+        renderers = (
+            ("pyppeteer", self._render_with_browser),
+            ("mmdc", _render_with_mmdc),
+            ("mermaid.ink SVG + cairosvg", _render_with_api_svg),
+            ("mermaid.ink API", _render_with_api),
+        )
+        self._render_first(renderers, mermaid_src, png_path)
+
+    def render(self, mermaid_src: str, out_path: Path, fmt: DiagramFormat):
+        """Renders Mermaid source to `out_path` in the given format."""
+        if fmt == "svg":
+            self.render_svg(mermaid_src, out_path)
+        else:
+            self.render_png(mermaid_src, out_path)
+
+    @staticmethod
+    def _render_first(renderers, mermaid_src: str, out_path: Path):
+        """
+        Runs each renderer in turn until one succeeds.
+
+        Renderers are tried local-first, so the common path needs no network
+        access and is not subject to the web API's size limits.
+
+        Raises:
+            RendererUnavailableError: If every renderer failed.
+        """
+        for name, render in renderers:
+            try:
+                render(mermaid_src, out_path)
+                return
+            except RENDERER_ERRORS as e:
+                logger.info(">>> %s renderer unavailable: %s", name, e)
+        raise RendererUnavailableError("No Mermaid renderer succeeded")
+
+    def _render_with_browser(self, mermaid_src: str, png_path: Path):
+        """Renders a PNG in the shared headless browser."""
+        self._run_in_browser(self._screenshot, mermaid_src, png_path)
+
+    def _render_svg_with_browser(self, mermaid_src: str, svg_path: Path):
+        """Renders an SVG in the shared headless browser."""
+        self._run_in_browser(self._save_svg, mermaid_src, svg_path)
+
+    def _run_in_browser(self, render, *args):
+        """
+        Runs a page coroutine on the shared browser, launching it on first use.
+
+        Raises:
+            ImportError: If pyppeteer is not installed.
+            RendererUnavailableError: If the browser failed to launch or to render.
+        """
+        from pyppeteer.errors import PyppeteerError
+
+        if self._page is None:
+            if self._browser_error is not None:
+                raise RendererUnavailableError(f"browser failed to launch: {self._browser_error}")
+            try:
+                self._loop.run_until_complete(self._open_page())
+            except Exception as e:
+                # Launching fails in too many ways to list (Chromium download,
+                # sandboxing, a missing shared library); all of them only
+                # mean the browser renderer is unavailable
+                self._browser_error = e
+                self._close_browser()
+                raise RendererUnavailableError(f"browser failed to launch: {e}") from e
+        try:
+            self._loop.run_until_complete(render(*args))
+        except PyppeteerError as e:
+            raise RendererUnavailableError(f"browser failed to render the diagram: {e}") from e
+
+    async def _open_page(self):
+        """
+        Launches Chromium and prepares a blank page with Mermaid loaded.
+
+        The page is only published on `self._page` once Mermaid is ready, so a
+        failed setup leaves the renderer marked as not launched.
+        """
+        from pyppeteer import launch
+
+        # Checked before launching so a missing or unverified bundle costs no
+        # Chromium start-up
+        if not MERMAID_JS_PATH.exists():
+            logger.warning(
+                ">>> %s not found; run `python visualize_graph.py --fetch-mermaid` to enable the browser renderer",
+                MERMAID_JS_PATH,
+            )
+            raise FileNotFoundError(f"{MERMAID_JS_PATH} not found")
+        _verify_mermaid_bundle()
+
+        self._browser = await launch(args=_chromium_args())
+        page = await self._browser.newPage()
+        await page.setViewport({"width": 1600, "height": 1200, "deviceScaleFactor": 2})
+        await page.goto("about:blank")
+        await page.addScriptTag({"path": str(MERMAID_JS_PATH)})
+        await page.evaluate("() => mermaid.initialize({ startOnLoad: false })")
+        self._page = page
+
+    async def _mermaid_svg(self, mermaid_src: str) -> str:
+        """Renders the source to an SVG document in the page."""
+        return await self._page.evaluate(
+            "async (src) => (await mermaid.render('cerina-diagram', src)).svg",
+            mermaid_src,
+        )
+
+    async def _save_svg(self, mermaid_src: str, svg_path: Path):
+        """Renders the source to SVG in the page and writes it to a file."""
+        svg_path.write_text(await self._mermaid_svg(mermaid_src), encoding="utf-8")
+
+    async def _screenshot(self, mermaid_src: str, png_path: Path):
+        """Renders the source to SVG in the page and captures it as a PNG file."""
+        svg = await self._mermaid_svg(mermaid_src)
+        await self._page.evaluate(
+            "(svg) => { document.body.style.background = 'white'; document.body.innerHTML = svg; }",
+            svg,
+        )
+        element = await self._page.querySelector("svg")
+        await element.screenshot({"type": "png", "path": str(png_path)})
+
+
+def _write_mermaid_source(mermaid_src: str, mmd_path: Path):
+    """
+    Writes a diagram's Mermaid source, skipping the write if it is unchanged.
+
+    Args:
+        mermaid_src (str): The Mermaid diagram source.
+        mmd_path (Path): Where to write the `.mmd` file.
+    """
+    if mmd_path.exists() and mmd_path.read_text(encoding="utf-8", errors="ignore") == mermaid_src:
+        return
+    with _atomic_output(mmd_path) as tmp_file:
+        tmp_file.write_text(mermaid_src, encoding="utf-8")
+
+
+def _emit_diagram(renderer: GraphRenderer, mermaid_src: str, output_file: Path, fmt: DiagramFormat):
+    """
+    Writes one format of a diagram, from the cache when possible.
+
+    Args:
+        renderer (GraphRenderer): The renderer used on a cache miss.
+        mermaid_src (str): The Mermaid diagram source.
+        output_file (Path): Where to write the diagram.
+        fmt (DiagramFormat): The image format, "svg" or "png".
+    """
+    # A sidecar next to the output records which source it was rendered
+    # from; if it matches, the output is already up to date
+    digest = _source_digest(mermaid_src)
+    hash_file = output_file.with_name(f".{output_file.name}.hash")
+    if output_file.exists() and hash_file.exists() and hash_file.read_text(errors="ignore") == digest:
+        logger.info(">>> ✅ '%s' is already up to date", output_file)
+        return
+
+    cached_file = _cache_path(mermaid_src, fmt)
+
+    if not cached_file.exists():
+        # Render the graph straight into the cache, locally if possible
+        CACHE_DIR.mkdir(exist_ok=True)
+        with _atomic_output(cached_file) as tmp_file:
+            renderer.render(mermaid_src, tmp_file, fmt)
+    else:
+        logger.info(">>> Graph unchanged, reusing cached %s diagram", fmt.upper())
+
+    # Copy file-to-file (the OS can do this without a Python-side buffer)
+    with _atomic_output(output_file) as tmp_file:
+        shutil.copyfile(cached_file, tmp_file)
+    hash_file.write_text(digest)
+
+    logger.info(">>> ✅ Success! Saved diagram to '%s'", output_file)
+
+
+def generate_graph_diagram(
+    fmt: Union[DiagramFormat, Sequence[DiagramFormat]] = "svg",
+    xray: bool = True,
+    output_file: Optional[str] = None,
+    renderer: Optional[GraphRenderer] = None,
+):
+    """
+    Compiles the current graph state and exports it as SVG and/or PNG diagrams.
+
+    This function inspects the compiled graph object, optionally including
+    'x-ray' views of nested subgraphs, and saves the visual representation to
+    the local filesystem. Each diagram is served from the local cache when the
+    graph's Mermaid source has not changed since a previous render. Several
+    formats share one renderer, so the headless browser starts at most once.
+
+    The Mermaid source is always written next to the diagram (same name,
+    `.mmd` suffix) before rendering, so a failed render still leaves a
+    readable description of the graph on disk.
+
+    Args:
+        fmt (Union[DiagramFormat, Sequence[DiagramFormat]]): "svg" (the
+            default) for a vector diagram, "png" to rasterize it, or several
+            formats at once.
+        xray (bool): Expand nested subgraphs. `False` draws only the top-level
+            shape, which yields a smaller Mermaid source and therefore a shorter
+            mermaid.ink URL, staying clear of the API's size limit on large graphs.
+        output_file (Optional[str]): Where to write the diagram. Defaults to
+            `architecture_diagram.<fmt>`; with several formats, its suffix is
+            replaced by each format's.
+        renderer (Optional[GraphRenderer]): A renderer to reuse across calls.
+            If omitted, a temporary one is created for this call only.
+
+    Rendering failures (often due to missing network access for the API or
+    missing local rendering libraries) are logged rather than raised. Errors
+    building the workflow itself propagate.
+    """
+    logger.info(">>> Generating Architecture Diagram...")
+    formats = [fmt] if isinstance(fmt, str) else list(dict.fromkeys(fmt))
+    mmd_file = None
+
     try:
         # Retrieve the graph object from the compiled workflow
         # xray=True allows visualization of inner workings of subgraphs
-        app_graph = graph.get_graph(xray=True)
-        
-        # Render the graph as a PNG binary
-        # Uses the default Mermaid renderer (requires internet for API or local install)
-        png_data = app_graph.draw_mermaid_png()
-        
-        # Define output path
-        output_file = "architecture_diagram.png"
-        
-        # Write binary data to disk
-        with open(output_file, "wb") as f:
-            f.write(png_data)
-            
-        print(f">>> ✅ Success! Saved diagram to '{output_file}'")
-        
-    except Exception as e:
-        print(f">>> ❌ Failed to generate graph: {e}")
-        print("Tip: Ensure you have internet access or the necessary graphviz/grandalf libraries installed.")
+        app_graph = _drawable_graph(xray=xray)
+
+        output_file = Path(output_file or f"architecture_diagram.{formats[0]}")
+
+        mermaid_src = app_graph.draw_mermaid()
+
+        # The source goes to disk before any rendering is attempted, so a
+        # failed render still leaves a diagram that GitHub and most Markdown
+        # viewers can display
+        mmd_file = output_file.with_suffix(".mmd")
+        _write_mermaid_source(mermaid_src, mmd_file)
+
+        with (nullcontext(renderer) if renderer is not None else GraphRenderer()) as active_renderer:
+            for f in formats:
+                _emit_diagram(active_renderer, mermaid_src, output_file.with_suffix(f".{f}"), f)
+
+    except (RendererUnavailableError, OSError) as e:
+        # Each renderer's failure was already logged, so no traceback here
+        logger.error(">>> ❌ Failed to generate graph: %s", e)
+        if mmd_file is not None and mmd_file.exists():
+            logger.warning(">>> Mermaid source is still available at '%s'", mmd_file)
+        logger.error("Tip: Install pyppeteer or @mermaid-js/mermaid-cli to render locally, or ensure internet access for the API.")
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Render the Cerina workflow architecture diagram.")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only report warnings and errors")
+    parser.add_argument("--no-xray", dest="xray", action="store_false", help="draw only the top-level graph")
+    # PNG stays the CLI default because the README embeds architecture_diagram.png
+    parser.add_argument(
+        "--format", dest="formats", nargs="+", choices=("png", "svg"), default=["png"],
+        help="output format(s)",
+    )
+    parser.add_argument("-o", "--output", help="output path (default: architecture_diagram.<format>)")
+    parser.add_argument(
+        "--fetch-mermaid", action="store_true",
+        help=f"download the pinned Mermaid {MERMAID_VERSION} bundle for the headless browser first",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.WARNING if args.quiet else logging.INFO,
+        format="%(message)s",
+        stream=sys.stderr,
+    )
+
+    if args.fetch_mermaid:
+        fetch_mermaid_bundle()
+
+    with GraphRenderer() as renderer:
+        generate_graph_diagram(fmt=args.formats, xray=args.xray, output_file=args.output, renderer=renderer)
 
 if __name__ == "__main__":
-    generate_graph_image()
\ No newline at end of file
+    main()